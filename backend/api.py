@@ -1,25 +1,41 @@
 import os
 import io
 import csv
+import codecs
 import re
 import json
-from typing import Dict, List, Optional, Tuple
+import hmac
+import asyncio
+import hashlib
+import collections
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Header
-from fastapi.responses import Response, JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+try:
+    import orjson
+except ImportError:  # optional; fall back to the stdlib json module
+    orjson = None
+
 from telem_engine import (
     pad_row,
     find_crew_info_table,
     build_output_filename,
     apply_updates,
+    index_sheet_labels,
 )
 
 APP_PASSWORD = os.environ.get("C150_PASSWORD", "")
+_APP_PASSWORD_BYTES = APP_PASSWORD.encode("utf-8") if APP_PASSWORD else b""
+_PW_CONFIGURED = bool(APP_PASSWORD)
 ALLOWED_ORIGINS = os.environ.get("CORS_ORIGINS", "*").split(",")
 
-UNI_RE = re.compile(r"^[a-z]{2,8}\d{3,8}$", re.IGNORECASE)
+UNI_RE = re.compile(r"[a-z]{2,8}\d{3,8}", re.IGNORECASE)  # use with fullmatch
+
+_ALLOWED_ZONES = frozenset({"T1", "T2", "T3", "T4", "T5", "T6"})
+_POS_KEYS: Tuple[str, ...] = tuple(f"pos_{i}" for i in range(1, 9))
 
 app = FastAPI(title="C150 Telemetry Processor")
 
@@ -33,10 +49,15 @@ app.add_middleware(
 )
 
 
+def _json_loads(raw: str | bytes):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
 def require_password(x_c150_password: str | None):
-    if not APP_PASSWORD:
+    if not _PW_CONFIGURED:
         raise HTTPException(status_code=500, detail="Server misconfigured: missing C150_PASSWORD.")
-    if (x_c150_password or "") != APP_PASSWORD:
+    # Constant-time compare so response timing doesn't leak the password
+    if not hmac.compare_digest(_APP_PASSWORD_BYTES, (x_c150_password or "").encode("utf-8")):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
 
@@ -46,8 +67,69 @@ def read_csv_bytes(data: bytes) -> List[List[str]]:
     return [row for row in reader]
 
 
+_UPLOAD_CHUNK = 65536
+
+# Recently parsed uploads keyed by content digest (preview then process re-sends
+# the same file). Callers edit rows in place, so only copies ever leave the cache.
+_PARSE_CACHE: "collections.OrderedDict[bytes, List[List[str]]]" = collections.OrderedDict()
+_PARSE_CACHE_MAX = 8
+
+
+def _parse_cache_get(key: bytes) -> Optional[List[List[str]]]:
+    rows = _PARSE_CACHE.get(key)
+    if rows is None:
+        return None
+    _PARSE_CACHE.move_to_end(key)
+    return [r[:] for r in rows]
+
+
+def _parse_cache_put(key: bytes, rows: List[List[str]]) -> List[List[str]]:
+    _PARSE_CACHE[key] = rows
+    if len(_PARSE_CACHE) > _PARSE_CACHE_MAX:
+        _PARSE_CACHE.popitem(last=False)
+    return [r[:] for r in rows]
+
+
+async def read_csv_upload(file: UploadFile) -> List[List[str]]:
+    """
+    Parse an upload without holding the raw bytes, the decoded str and a StringIO copy
+    all at once: chunks are decoded incrementally and split into lines as they arrive.
+    Re-uploads of recently seen content skip tokenizing via _PARSE_CACHE.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    lines: List[str] = []
+    pending = ""
+
+    while chunk := await file.read(_UPLOAD_CHUNK):
+        digest.update(chunk)
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        lines.extend(line + "\n" for line in complete)
+
+    key = digest.digest()
+    rows = _parse_cache_get(key)
+    if rows is not None:
+        return rows
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        lines.append(pending)
+
+    # Quoted fields may span chunks, so one reader sees every line in order.
+    # Tokenizing is CPU-bound; keep it off the event loop.
+    reader = csv.reader(iter(lines))
+    return _parse_cache_put(key, await asyncio.to_thread(list, reader))
+
+
+_SIG_FILE_INFO = frozenset({"Serial #", "Session", "Filename", "Start Time"})
+_SIG_GPS = frozenset({"Lat", "Lon", "UTC", "PeachTime"})
+_SIG_CREW = frozenset({"Position", "Name", "Abbr", "Weight"})
+_SIG_PIECE = frozenset({"Start", "End", "#", "Duration", "Distance", "Rating", "Pace", "comment", "Wind", "Stream", "Validated"})
+
+
 def _header_signature(row: List[str]) -> set:
-    return {str(c).strip() for c in row if c is not None and str(c).strip() != ""}
+    return {s for c in row if c is not None and (s := str(c).strip())}
 
 
 def trim_to_first_export(rows: List[List[str]]) -> List[List[str]]:
@@ -58,111 +140,119 @@ def trim_to_first_export(rows: List[List[str]]) -> List[List[str]]:
     hits = []
     for i, row in enumerate(rows):
         sig = _header_signature(row)
-        if {"Serial #", "Session", "Filename", "Start Time"}.issubset(sig):
+        if _SIG_FILE_INFO.issubset(sig):
             hits.append(i)
-    if len(hits) <= 1:
-        return rows
-    return rows[:hits[1] - 1]
+            # Nothing after the 2nd header matters; stop scanning
+            if len(hits) == 2:
+                return rows[:i - 1]
+    return rows
 
 
-def sanitize_for_naive_split_parser(rows: List[List[str]]) -> List[List[str]]:
-    """
-    Your parser uses line.split(',') (not a CSV parser).
-    So commas/quotes inside values will break it. Remove them.
-    """
-    out: List[List[str]] = []
-    for row in rows:
-        new_row: List[str] = []
-        for cell in row:
-            s = "" if cell is None else str(cell)
-            s = s.replace(",", " ")
-            s = s.replace('"', "")
-            new_row.append(s)
-        out.append(new_row)
-    return out
+# Required header columns that identify the section a bare '#ERROR!' marker belongs to.
+_BARE_MARKER_SIGNATURES: Dict[str, frozenset] = {
+    "File Info": _SIG_FILE_INFO,
+    "GPS Info": _SIG_GPS,
+    "Crew Info": _SIG_CREW,
+    "Piece": _SIG_PIECE,
+}
+
 
+_SANITIZE_TABLE = str.maketrans({",": " ", '"': None})
 
-def normalize_section_markers(rows: List[List[str]]) -> List[List[str]]:
+
+def _sanitize_cell(cell: Optional[str]) -> str:
+    return "" if cell is None else str(cell).translate(_SANITIZE_TABLE)
+
+
+def _row_is_sanitized(row: List[str]) -> bool:
+    return all(isinstance(c, str) and "," not in c and '"' not in c for c in row)
+
+
+def _normalize_marker_row(row: List[str]) -> List[str]:
     """
-    CRITICAL FIX:
-    Your outputs contain '=====,Section Name' but the parser only recognizes '#ERROR!,Section Name'.
-    Convert any '=====' style markers into '#ERROR!' markers.
+    Returns `row` with a '=====' marker converted to '#ERROR!' form.
+    Case A edits `row` in place; Case B returns a new row.
     """
-    out = [list(r) for r in rows]
+    first = (row[0] or "").strip()
 
-    for i, row in enumerate(out):
-        if not row:
-            continue
+    # Case A: first cell is exactly =====
+    if first == "=====":
+        row[0] = "#ERROR!"
+        return row
 
-        first = (row[0] or "").strip()
+    # Case B: first cell contains "===== File Info" (single-cell marker)
+    if first.startswith("=====") and "," not in first:
+        # Convert "===== File Info" -> ["#ERROR!", "File Info"]
+        section = first.replace("=====", "").strip()
+        return ["#ERROR!", section]
 
-        # Case A: first cell is exactly =====
-        if first == "=====":
-            row[0] = "#ERROR!"
-            out[i] = row
-            continue
+    # Case C: Already "#ERROR!" is fine
+    # (Leave it alone.)
+    return row
 
-        # Case B: first cell contains "===== File Info" (single-cell marker)
-        if first.startswith("=====") and "," not in first:
-            # Convert "===== File Info" -> ["#ERROR!", "File Info"]
-            section = first.replace("=====", "").strip()
-            out[i] = ["#ERROR!", section]
-            continue
 
-        # Case C: Already "#ERROR!" is fine
-        # (Leave it alone.)
+def _is_bare_error_marker(row: List[str]) -> bool:
+    return (row[0] or "").strip() == "#ERROR!" and (len(row) < 2 or (row[1] or "").strip() == "")
 
-    return out
 
+def _next_nonempty_row(rows: List[List[str]], start_idx: int) -> Optional[int]:
+    j = start_idx
+    while j < len(rows):
+        if rows[j] and any(str(c).strip() for c in rows[j]):
+            return j
+        j += 1
+    return None
+
+
+def _bare_marker_label(next_row: List[str]) -> Optional[List[str]]:
+    """Infer the full marker row for a bare '#ERROR!' from the row that follows it."""
+    sig = _header_signature(next_row)
+
+    for section, required in _BARE_MARKER_SIGNATURES.items():
+        if required.issubset(sig):
+            return ["#ERROR!", section]
+    if any("Aperiodic" in str(c) for c in next_row) and any("0x800A" in str(c) for c in next_row):
+        return ["#ERROR!", "Aperiodic", "0x800A"]
+    if any("Periodic" in str(c) for c in next_row):
+        return ["#ERROR!", "Periodic"]
+    return None
 
-def label_bare_error_markers(rows: List[List[str]]) -> List[List[str]]:
+
+def normalize_rows_inplace(rows: List[List[str]], *, sanitize: bool = True) -> int:
     """
-    If there is a bare '#ERROR!' line with no section name, infer it from the next header row.
-    (This is a bonus safety net; your main issue is '=====' markers.)
+    Single pass over `rows`, mutating it instead of copying it:
+    - your outputs contain '=====,Section Name' but the parser only recognizes
+      '#ERROR!,Section Name'; convert any '=====' style markers into '#ERROR!' markers
+    - label bare '#ERROR!' lines with no section name, inferred from the next header row
+      (a bonus safety net; the main issue is the '=====' markers above)
+    - if `sanitize`: your parser uses line.split(',') (not a CSV parser), so commas/quotes
+      inside values will break it. Remove them.
+    Returns the widest row length so the caller can pad to a rectangle.
     """
-    out = [list(r) for r in rows]
-
-    def next_nonempty_row(start_idx: int) -> Optional[int]:
-        j = start_idx
-        while j < len(out):
-            if out[j] and any(str(c).strip() for c in out[j]):
-                return j
-            j += 1
-        return None
+    max_len = 0
 
-    i = 0
-    while i < len(out):
-        row = out[i]
-        if not row:
-            i += 1
-            continue
-
-        first = (row[0] or "").strip()
+    for i, row in enumerate(rows):
+        if row:
+            row = _normalize_marker_row(row)
 
-        if first == "#ERROR!" and (len(row) < 2 or (row[1] or "").strip() == ""):
-            j = next_nonempty_row(i + 1)
-            if j is None:
-                i += 1
-                continue
+            if _is_bare_error_marker(row):
+                j = _next_nonempty_row(rows, i + 1)
+                if j is not None:
+                    # Look ahead at the row as it will look once normalized
+                    labelled = _bare_marker_label(_normalize_marker_row(rows[j]))
+                    if labelled is not None:
+                        row = labelled
 
-            sig = _header_signature(out[j])
+            if sanitize and not _row_is_sanitized(row):
+                for c, cell in enumerate(row):
+                    row[c] = _sanitize_cell(cell)
 
-            if {"Serial #", "Session", "Filename", "Start Time"}.issubset(sig):
-                out[i] = ["#ERROR!", "File Info"]
-            elif {"Lat", "Lon", "UTC", "PeachTime"}.issubset(sig):
-                out[i] = ["#ERROR!", "GPS Info"]
-            elif {"Position", "Name", "Abbr", "Weight"}.issubset(sig):
-                out[i] = ["#ERROR!", "Crew Info"]
-            elif {"Start", "End", "#", "Duration", "Distance", "Rating", "Pace", "comment", "Wind", "Stream", "Validated"}.issubset(sig):
-                out[i] = ["#ERROR!", "Piece"]
-            elif any("Aperiodic" in str(c) for c in out[j]) and any("0x800A" in str(c) for c in out[j]):
-                out[i] = ["#ERROR!", "Aperiodic", "0x800A"]
-            elif any("Periodic" in str(c) for c in out[j]):
-                out[i] = ["#ERROR!", "Periodic"]
+            rows[i] = row
 
-        i += 1
+        if len(row) > max_len:
+            max_len = len(row)
 
-    return out
+    return max_len
 
 
 def parse_first_crew(rows: List[List[str]]) -> List[Dict[str, str]]:
@@ -181,23 +271,30 @@ def parse_first_crew(rows: List[List[str]]) -> List[Dict[str, str]]:
 
     out: List[Dict[str, str]] = []
     seen = set()
+    pad_n = max(name_c, abbr_c, weight_c) + 1
+    _uni_match = UNI_RE.fullmatch
 
     for r in range(start, end):
-        if not rows[r]:
+        row = rows[r]
+        if not row:
             continue
-        pos_raw = (rows[r][pos_c] or "").strip()
+        pos_raw = (row[pos_c] or "").strip()
         if not pos_raw.isdigit():
             continue
         pos = int(pos_raw)
         if pos < 1 or pos > 8 or pos in seen:
             continue
 
-        pad_row(rows[r], max(name_c, abbr_c, weight_c) + 1)
-        name = (rows[r][name_c] or "").strip()
-        abbr = (rows[r][abbr_c] or "").strip()
-        w = (rows[r][weight_c] or "").strip()
+        pad_row(row, pad_n)
+        name = (row[name_c] or "").strip()
+        abbr = (row[abbr_c] or "").strip()
+        w = (row[weight_c] or "").strip()
 
-        if not abbr or not UNI_RE.match(abbr):
+        # Cheap length/first/last-char prescreen before entering the regex engine
+        la = len(abbr)
+        if la < 5 or la > 16 or not abbr[0].isalpha() or not abbr[-1].isdigit():
+            continue
+        if not _uni_match(abbr):
             continue
 
         out.append({"pos": pos, "name": name, "abbr": abbr, "existing_weight": w})
@@ -209,6 +306,26 @@ def parse_first_crew(rows: List[List[str]]) -> List[Dict[str, str]]:
     return out
 
 
+_OUTPUT_BATCH_ROWS = 1024
+
+
+def iter_csv_bytes(rows: List[List[str]]) -> Iterator[bytes]:
+    """
+    Serialize rows as CSV in batches, so the response starts streaming right away
+    and only one batch is ever held as bytes.
+    Each batch is encoded straight into a bytes buffer (no str + .encode() copy).
+    """
+    buf = io.BytesIO()
+    text_buf = io.TextIOWrapper(buf, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(text_buf, lineterminator="\n")
+    for start in range(0, len(rows), _OUTPUT_BATCH_ROWS):
+        writer.writerows(rows[start:start + _OUTPUT_BATCH_ROWS])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    text_buf.detach()  # leave buf open; nothing left to flush
+
+
 @app.get("/")
 def home():
     return {"status": "ok", "service": "C150 Telemetry Processor"}
@@ -221,13 +338,10 @@ async def preview_crew(
 ):
     require_password(x_c150_password)
 
-    data = await file.read()
-    rows = read_csv_bytes(data)
+    rows = await read_csv_upload(file)
 
     rows = trim_to_first_export(rows)
-    rows = normalize_section_markers(rows)
-    rows = label_bare_error_markers(rows)
-    rows = sanitize_for_naive_split_parser(rows)
+    normalize_rows_inplace(rows)
 
     crew = parse_first_crew(rows)
     payload = {"crew": crew}
@@ -236,35 +350,28 @@ async def preview_crew(
     return JSONResponse(payload)
 
 
-@app.post("/process")
-async def process_file(
-    file: UploadFile = File(...),
-
-    season: str = Form("FY26"),
-    shell: str = Form(...),
-    zone: str = Form(...),
-    piece: str = Form(...),
-    piece_number: str = Form(...),
-
-    cox_uni: str = Form(...),
-    rig_info: str = Form(...),
-
-    wind: str = Form(...),
-    stream: str = Form(...),
-    temperature: str = Form(...),
-
-    weights_json: str = Form(...),
-
-    x_c150_password: str | None = Header(default=None),
-):
-    require_password(x_c150_password)
-
+async def _process_upload(
+    file: UploadFile,
+    *,
+    season: str,
+    shell: str,
+    zone: str,
+    piece: str,
+    piece_number: str,
+    cox_uni: str,
+    rig_info: str,
+    wind: str,
+    stream: str,
+    temperature: str,
+    weights_obj: object,
+) -> StreamingResponse:
+    """Shared validation + processing behind /process and /process-json."""
     shell_clean = " ".join((shell or "").split()).upper()
     if not shell_clean:
         raise HTTPException(status_code=400, detail="Shell is required.")
 
     zone_clean = (zone or "").strip().upper()
-    if zone_clean not in {"T1", "T2", "T3", "T4", "T5", "T6"}:
+    if zone_clean not in _ALLOWED_ZONES:
         raise HTTPException(status_code=400, detail="Zone must be one of T1..T6.")
 
     piece_clean = (piece or "").strip()
@@ -283,16 +390,12 @@ async def process_file(
     except Exception:
         raise HTTPException(status_code=400, detail="Wind/Stream/Temperature must be integers (m/s, m/s, °C).")
 
-    try:
-        weights_obj = json.loads(weights_json)
-        if not isinstance(weights_obj, dict):
-            raise ValueError()
-    except Exception:
+    if not isinstance(weights_obj, dict):
         raise HTTPException(status_code=400, detail="weights_json must be a JSON object mapping pos keys to kg values.")
 
-    for seat in range(1, 9):
-        k = f"pos_{seat}"
-        raw = str(weights_obj.get(k, "")).strip()
+    for seat, k in enumerate(_POS_KEYS, 1):
+        raw = weights_obj.get(k, "")
+        raw = (raw if isinstance(raw, str) else str(raw)).strip()
         if raw == "":
             raise HTTPException(status_code=400, detail=f"Missing weight for seat {seat} (kg).")
         try:
@@ -309,12 +412,11 @@ async def process_file(
         if kk:
             weights_by_key[kk] = vv
 
-    data = await file.read()
-    rows = read_csv_bytes(data)
+    rows = await read_csv_upload(file)
 
     rows = trim_to_first_export(rows)
-    rows = normalize_section_markers(rows)
-    rows = label_bare_error_markers(rows)
+    normalize_rows_inplace(rows, sanitize=False)
+    idx = index_sheet_labels(rows)
 
     out_name = build_output_filename(
         season=season,
@@ -323,9 +425,11 @@ async def process_file(
         zone=zone_clean,
         piece=piece_clean,
         piece_num=piece_number_clean,
+        idx=idx,
     )
 
-    updated = apply_updates(
+    updated = await asyncio.to_thread(
+        apply_updates,
         rows=rows,
         cox_uni=cox_uni.strip(),
         rig_info=rig_info.strip(),
@@ -334,27 +438,118 @@ async def process_file(
         temperature=temp_i,
         zone=zone_clean,
         weights_by_abbr=weights_by_key,
+        idx=idx,
     )
 
-    # Ensure markers are what your parser expects
-    updated = normalize_section_markers(updated)
-    updated = label_bare_error_markers(updated)
+    # Ensure markers are what your parser expects, and make safe for naive line.split(',')
+    max_len = normalize_rows_inplace(updated)
 
-    # Make safe for naive line.split(',')
-    updated = sanitize_for_naive_split_parser(updated)
-
-    # Rectangular output (nice for Sheets/Excel)
-    max_len = max((len(r) for r in updated), default=0)
+    # Rectangular output (nice for Sheets/Excel); most rows are already max_len
     for r in updated:
-        pad_row(r, max_len)
-
-    buf = io.StringIO()
-    writer = csv.writer(buf, lineterminator="\n")
-    writer.writerows(updated)
-    out_bytes = buf.getvalue().encode("utf-8")
+        missing = max_len - len(r)
+        if missing:
+            r.extend([""] * missing)
 
-    return Response(
-        content=out_bytes,
+    return StreamingResponse(
+        iter_csv_bytes(updated),
         media_type="text/csv",
         headers={"Content-Disposition": f'attachment; filename="{out_name}"'},
+    )
+
+
+@app.post("/process")
+async def process_file(
+    file: UploadFile = File(...),
+
+    season: str = Form("FY26"),
+    shell: str = Form(...),
+    zone: str = Form(...),
+    piece: str = Form(...),
+    piece_number: str = Form(...),
+
+    cox_uni: str = Form(...),
+    rig_info: str = Form(...),
+
+    wind: str = Form(...),
+    stream: str = Form(...),
+    temperature: str = Form(...),
+
+    weights_json: str = Form(...),
+
+    x_c150_password: str | None = Header(default=None),
+):
+    require_password(x_c150_password)
+
+    try:
+        weights_obj = _json_loads(weights_json)
+    except Exception:
+        weights_obj = None  # rejected by the object check in _process_upload
+
+    return await _process_upload(
+        file,
+        season=season,
+        shell=shell,
+        zone=zone,
+        piece=piece,
+        piece_number=piece_number,
+        cox_uni=cox_uni,
+        rig_info=rig_info,
+        wind=wind,
+        stream=stream,
+        temperature=temperature,
+        weights_obj=weights_obj,
+    )
+
+
+_PROCESS_META_FIELDS: Tuple[str, ...] = (
+    "shell", "zone", "piece", "piece_number", "cox_uni", "rig_info", "wind", "stream", "temperature",
+)
+
+
+def _meta_text(key: str, v) -> str:
+    """A /process-json meta value as form text: strings and plain numbers only."""
+    # bool is an int subclass, but "True" isn't a sheet value
+    if isinstance(v, str):
+        return v
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return str(v)
+    raise HTTPException(status_code=400, detail=f"meta {key} must be a string or number.")
+
+
+@app.post("/process-json")
+async def process_file_json(
+    file: UploadFile = File(...),
+    meta: str = Form(...),
+    x_c150_password: str | None = Header(default=None),
+):
+    """
+    Same as /process, but every field arrives in one JSON object `meta` (one parse instead
+    of a multipart field each). Keys match the /process form fields, with `weights_json`
+    given as an object rather than a nested JSON string.
+    """
+    require_password(x_c150_password)
+
+    try:
+        meta_obj = _json_loads(meta)
+        if not isinstance(meta_obj, dict):
+            raise ValueError()
+    except Exception:
+        raise HTTPException(status_code=400, detail="meta must be a JSON object of /process fields.")
+
+    fields: Dict[str, str] = {}
+    for k in _PROCESS_META_FIELDS:
+        v = meta_obj.get(k)
+        if v is None:
+            raise HTTPException(status_code=400, detail=f"meta is missing {k}.")
+        fields[k] = _meta_text(k, v)
+
+    # null counts as missing, like an absent key
+    season = meta_obj.get("season")
+    season = "FY26" if season is None else _meta_text("season", season)
+
+    return await _process_upload(
+        file,
+        season=season,
+        weights_obj=meta_obj.get("weights_json"),
+        **fields,
     )
\ No newline at end of file
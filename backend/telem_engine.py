@@ -13,56 +13,106 @@ def pad_row(row: List[str], min_len: int) -> List[str]:
     return row
 
 
+def _pad_rows_to(rows: List[List[str]], r0: int, r1: int, width: int) -> None:
+    """pad_row for every row in rows[r0:r1], in one pass."""
+    for r in range(r0, r1):
+        row = rows[r]
+        missing = width - len(row)
+        if missing > 0:
+            row.extend([""] * missing)
+
+
 def is_section_header_row(row: List[str]) -> bool:
     # Peach section headers look like: "===== Crew Info", "===== Piece", etc.
-    if not row:
-        return False
-    return ((row[0] or "").strip().startswith("====="))
+    # lstrip() hands back the same str when there's no leading whitespace (no copy);
+    # trailing whitespace never affects startswith
+    return bool(row) and isinstance(row[0], str) and row[0].lstrip().startswith("=====")
 
 
 def find_first_cell(rows: List[List[str]], target: str) -> Optional[Tuple[int, int]]:
+    tlen = len(target)
     for r_idx, row in enumerate(rows):
         for c_idx, cell in enumerate(row):
-            if (cell or "").strip() == target:
+            # strip() only shortens, so shorter cells can't match (and skip the allocation)
+            if not cell or len(cell) < tlen:
+                continue
+            if cell.strip() == target:
                 return r_idx, c_idx
     return None
 
 
+def _build_cell_index(rows: List[List[str]], targets: frozenset) -> Dict[str, Tuple[int, int]]:
+    """
+    One pass over the sheet: maps each of `targets` to the (row, col) of the first
+    cell whose stripped text equals it. Same answers as find_first_cell per target.
+    """
+    idx: Dict[str, Tuple[int, int]] = {}
+    for r_idx, row in enumerate(rows):
+        for c_idx, cell in enumerate(row):
+            if cell:
+                s = cell.strip()
+                if s in targets and s not in idx:
+                    idx[s] = (r_idx, c_idx)
+                    if len(idx) == len(targets):
+                        return idx
+    return idx
+
+
+def _header_search_start(idx: Dict[str, Tuple[int, int]], required: frozenset) -> Optional[int]:
+    """
+    Earliest row a header containing all of `required` can be on (it can't come before
+    the first occurrence of any of them), or None if one never appears at all.
+    """
+    start = 0
+    for name in required:
+        pos = idx.get(name)
+        if pos is None:
+            return None
+        start = max(start, pos[0])
+    return start
+
+
 def header_col_map(header_row: List[str]) -> dict:
     return {cell.strip(): idx for idx, cell in enumerate(header_row) if cell is not None and cell.strip() != ""}
 
 
-def find_piece_header_row(rows: List[List[str]]) -> Optional[int]:
+_CREW_REQUIRED = frozenset({"Position", "Name", "Abbr", "Weight"})
+_PIECE_REQUIRED = frozenset({"Pace", "comment", "Wind", "Stream", "Validated"})
+
+
+def _row_has_all(row: List[str], required: frozenset, probe: str) -> bool:
     """
-    Finds the header row of the Piece table (the one containing columns like:
-    Pace, comment, Wind, Stream, Validated)
+    True if `row`'s stripped cells include every name in `required`. Rows too short,
+    or without `probe` (one of `required`), are rejected before building a set.
     """
-    required = {"Pace", "comment", "Wind", "Stream", "Validated"}
-    for r_idx, row in enumerate(rows):
-        s = {cell.strip() for cell in row if cell is not None and str(cell).strip() != ""}
-        if required.issubset(s):
-            return r_idx
-    return None
+    if len(row) < len(required):
+        return False
+    if probe not in row and not any(c and c.strip() == probe for c in row):
+        return False
+    s = {cell.strip() for cell in row if cell is not None and str(cell).strip() != ""}
+    return required.issubset(s)
 
 
-def find_table_bounds_from_header(rows: List[List[str]], header_r: int) -> Tuple[int, int]:
+def find_piece_header_row(rows: List[List[str]], search_from: int = 0) -> Optional[Tuple[int, int]]:
     """
-    Given a header row index, returns (start, end) where:
-      start = first data row after header
-      end = first row index where next section header begins OR EOF
+    Finds the header row of the Piece table (the one containing columns like:
+    Pace, comment, Wind, Stream, Validated), searching from row `search_from`.
+
+    Returns (header_row_idx, end_row_idx_exclusive), where the table ends at the
+    next section header OR EOF; found by carrying on from the header in the same scan.
     """
-    start = header_r + 1
-    end = start
-    while end < len(rows):
-        if is_section_header_row(rows[end]):
-            break
-        end += 1
-    return start, end
+    for r_idx in range(search_from, len(rows)):
+        if _row_has_all(rows[r_idx], _PIECE_REQUIRED, "Pace"):
+            for end in range(r_idx + 1, len(rows)):
+                if is_section_header_row(rows[end]):
+                    return r_idx, end
+            return r_idx, len(rows)
+    return None
 
 
-def find_crew_info_table(rows: List[List[str]]) -> Optional[Tuple[int, int, int, dict]]:
+def find_crew_info_table(rows: List[List[str]], search_from: int = 0) -> Optional[Tuple[int, int, int, dict]]:
     """
-    Locate the Crew Info table.
+    Locate the Crew Info table, searching for its header from row `search_from`.
 
     Returns (header_row_idx, start_row_idx, end_row_idx_exclusive, col_map)
 
@@ -70,10 +120,9 @@ def find_crew_info_table(rows: List[List[str]]) -> Optional[Tuple[int, int, int,
     - End the table at the next '=====' section header (NOT '#ERROR!')
     - Stop if we hit Cox/Coach lines
     """
-    required = {"Position", "Name", "Abbr", "Weight"}
-    for r_idx, row in enumerate(rows):
-        s = {cell.strip() for cell in row if cell is not None and str(cell).strip() != ""}
-        if required.issubset(s):
+    for r_idx in range(search_from, len(rows)):
+        row = rows[r_idx]
+        if _row_has_all(row, _CREW_REQUIRED, "Weight"):
             col_map = header_col_map(row)
             start = r_idx + 1
             end = start
@@ -92,62 +141,96 @@ def find_crew_info_table(rows: List[List[str]]) -> Optional[Tuple[int, int, int,
     return None
 
 
+# Fixed labels looked up by extract_yyyymmdd and apply_updates
+_SHEET_LABELS = frozenset({"Cox", "Start Time"}) | _CREW_REQUIRED | _PIECE_REQUIRED
+
+
+def index_sheet_labels(rows: List[List[str]]) -> Dict[str, Tuple[int, int]]:
+    """
+    First (row, col) of each fixed label in one sheet scan. Build it once per request
+    and pass it to build_output_filename / apply_updates (rows must not change in between).
+    """
+    return _build_cell_index(rows, _SHEET_LABELS)
+
+
+_WS_RE = re.compile(r"\s+")
+_BAD_RE = re.compile(r"[^A-Za-z0-9_\-]")
+_UND_RE = re.compile(r"_+")
+_DATE_RE = re.compile(r"\d{1,2} [A-Za-z]{3} \d{4}")
+_CLEAN_RE = re.compile(r"[A-Za-z0-9_\-]+")  # use with fullmatch
+
+
 def sanitize_token(s: str) -> str:
     """Make a string safe for filenames."""
     s = (s or "").strip()
-    s = re.sub(r"\s+", "_", s)
-    s = re.sub(r"[^A-Za-z0-9_\-]", "", s)
-    s = re.sub(r"_+", "_", s)
+    # Already-safe tokens (FY26, T1, ...) come back unchanged; skip the substitutions
+    if _CLEAN_RE.fullmatch(s) and "__" not in s and s[0] != "_" and s[-1] != "_":
+        return s
+    s = _WS_RE.sub("_", s)
+    s = _BAD_RE.sub("", s)
+    s = _UND_RE.sub("_", s)
     return s.strip("_")
 
 
-def extract_yyyymmdd(rows: List[List[str]]) -> str:
-    header_pos = find_first_cell(rows, "Start Time")
+def extract_yyyymmdd(rows: List[List[str]], idx: Optional[Dict[str, Tuple[int, int]]] = None) -> str:
+    header_pos = idx.get("Start Time") if idx is not None else find_first_cell(rows, "Start Time")
     if header_pos:
         r, c = header_pos
         if r + 1 < len(rows) and c < len(rows[r + 1]):
             raw = (rows[r + 1][c] or "").strip()
-            m = re.search(r"(\d{1,2} [A-Za-z]{3} \d{4})", raw)
+            m = _DATE_RE.search(raw)
             if m:
                 try:
-                    dt = datetime.strptime(m.group(1), "%d %b %Y")
+                    dt = datetime.strptime(m.group(0), "%d %b %Y")
                     return dt.strftime("%Y%m%d")
                 except Exception:
                     pass
     return date.today().strftime("%Y%m%d")
 
 
-def build_output_filename(season: str, rows: List[List[str]], shell: str, zone: str, piece: str, piece_num: str) -> str:
+def build_output_filename(
+    season: str,
+    rows: List[List[str]],
+    shell: str,
+    zone: str,
+    piece: str,
+    piece_num: str,
+    idx: Optional[Dict[str, Tuple[int, int]]] = None,
+) -> str:
     """
     Season_YYYYMMDD_BoatName_Zone_Piece_PieceNumber.csv
+    `idx` is an optional index_sheet_labels(rows) to skip the "Start Time" scan.
     """
-    yyyymmdd = extract_yyyymmdd(rows)
-
-    season_clean = sanitize_token((season or "FY26").strip()) or "FY26"
+    # Validate each required part as soon as it's sanitized, before the date lookup
+    # and the rest of the work (same checks, same order as before)
     shell_clean = " ".join((shell or "").split()).upper()
+    safe_shell = sanitize_token(shell_clean)
+    if not safe_shell:
+        raise ValueError("BoatName (Shell) is required for filename.")
+
     zone_clean = (zone or "").strip().upper()
+    safe_zone = sanitize_token(zone_clean)
+    if not safe_zone:
+        raise ValueError("Zone is required for filename.")
+
     piece_clean = (piece or "").strip()
+    safe_piece = sanitize_token(piece_clean)
+    if not safe_piece:
+        raise ValueError("Piece is required for filename.")
 
     try:
         piece_num_clean = str(int(str(piece_num).strip()))
     except Exception:
         piece_num_clean = sanitize_token(str(piece_num))
-
-    safe_season = sanitize_token(season_clean)
-    safe_shell = sanitize_token(shell_clean)
-    safe_zone = sanitize_token(zone_clean)
-    safe_piece = sanitize_token(piece_clean)
     safe_piece_num = sanitize_token(piece_num_clean)
-
-    if not safe_shell:
-        raise ValueError("BoatName (Shell) is required for filename.")
-    if not safe_zone:
-        raise ValueError("Zone is required for filename.")
-    if not safe_piece:
-        raise ValueError("Piece is required for filename.")
     if not safe_piece_num:
         raise ValueError("Piece number is required for filename.")
 
+    season_clean = sanitize_token((season or "FY26").strip()) or "FY26"
+    safe_season = sanitize_token(season_clean)
+
+    yyyymmdd = extract_yyyymmdd(rows, idx)
+
     return f"{safe_season}_{yyyymmdd}_{safe_shell}_{safe_zone}_{safe_piece}_{safe_piece_num}.csv"
 
 
@@ -155,79 +238,77 @@ def build_output_filename(season: str, rows: List[List[str]], shell: str, zone:
 # Core update logic
 # ----------------------------
 
-PACE_LIKE = re.compile(r".*:\d{2}.*")  # loose match to catch 1:31.1 etc
+PACE_LIKE = re.compile(r":\d\d")  # loose search to catch 1:31.1 etc
 
 
-def _ensure_column_between(
-    rows: List[List[str]],
-    header_r: int,
-    table_start: int,
-    table_end: int,
-    left_col_name: str,
-    new_col_name: str,
-    right_col_name: str,
-) -> int:
+def _insert_blank_cells(row: List[str], positions: List[int]) -> List[str]:
     """
-    Ensure `new_col_name` exists between `left_col_name` and `right_col_name`
-    in the header row. If missing, insert it into ALL rows within the table bounds.
-    Returns the column index of new_col_name (after insertion if done).
+    Build `row` with a blank cell at each of `positions` (ascending, final indices),
+    padding short rows the same way pad_row + list.insert would.
     """
-    header = rows[header_r]
-    cols = header_col_map(header)
-
-    # If already exists, return its index.
-    if new_col_name in cols:
-        return cols[new_col_name]
-
-    if left_col_name not in cols or right_col_name not in cols:
-        raise ValueError(f"Cannot insert {new_col_name}: missing {left_col_name} or {right_col_name} in Piece header.")
-
-    left_idx = cols[left_col_name]
-    right_idx = cols[right_col_name]
-
-    # Insert immediately to the right of left_col
-    insert_at = left_idx + 1
-
-    # Insert column into header + all table rows
-    for r in range(header_r, table_end):
-        pad_row(rows[r], insert_at)
-        rows[r].insert(insert_at, "")
-
-    # Set header cell
-    rows[header_r][insert_at] = new_col_name
-    return insert_at
-
-
-def _ensure_column_after(
+    out: List[str] = []
+    src = 0
+    for at in positions:
+        take = at - len(out)
+        chunk = row[src:src + take]
+        out += chunk
+        if len(chunk) < take:
+            out += [""] * (take - len(chunk))
+        src += len(chunk)
+        out.append("")
+    out += row[src:]
+    return out
+
+
+def _ensure_columns_batch(
     rows: List[List[str]],
     header_r: int,
     table_end: int,
-    anchor_col_name: str,
-    new_col_name: str,
-) -> int:
+    cols: dict,
+    inserts: List[Tuple[str, str, Optional[str]]],
+) -> None:
     """
-    Ensure `new_col_name` exists immediately after `anchor_col_name`.
-    If missing, insert it into ALL rows within the table bounds.
-    Returns the column index of new_col_name.
+    For each (new_col_name, left_col_name, right_col_name) in order: ensure `new_col_name`
+    exists immediately after `left_col_name` in the header row. `right_col_name`, if given,
+    only has to be present (its position isn't checked). Missing columns are inserted into
+    ALL rows within the table bounds.
+    `cols` is the header's header_col_map and is kept up to date in place.
+
+    Positions are worked out on the header first, then every row is rebuilt once,
+    instead of one list.insert pass over the table per column.
     """
-    header = rows[header_r]
-    cols = header_col_map(header)
+    header = list(rows[header_r])
+    positions: List[int] = []
 
-    if new_col_name in cols:
-        return cols[new_col_name]
+    for new_col_name, left_col_name, right_col_name in inserts:
+        # If already exists, nothing to insert.
+        if new_col_name in cols:
+            continue
 
-    if anchor_col_name not in cols:
-        raise ValueError(f"Cannot insert {new_col_name}: missing {anchor_col_name} in Piece header.")
+        if right_col_name is None:
+            if left_col_name not in cols:
+                raise ValueError(f"Cannot insert {new_col_name}: missing {left_col_name} in Piece header.")
+        elif left_col_name not in cols or right_col_name not in cols:
+            raise ValueError(f"Cannot insert {new_col_name}: missing {left_col_name} or {right_col_name} in Piece header.")
 
-    anchor_idx = cols[anchor_col_name]
-    insert_at = anchor_idx + 1
+        # Insert immediately to the right of left_col
+        insert_at = cols[left_col_name] + 1
+        pad_row(header, insert_at)
+        header.insert(insert_at, new_col_name)
+        for k, v in cols.items():
+            if v >= insert_at:
+                cols[k] = v + 1
+        cols[new_col_name] = insert_at
+        positions = [p + 1 if p >= insert_at else p for p in positions]
+        positions.append(insert_at)
 
-    for r in range(header_r, table_end):
-        pad_row(rows[r], insert_at)
-        rows[r].insert(insert_at, "")
+    if not positions:
+        return
 
-    rows[header_r][insert_at] = new_col_name
-    return insert_at
+    positions.sort()
+    rows[header_r] = header
+    for r in range(header_r + 1, table_end):
+        rows[r] = _insert_blank_cells(rows[r], positions)
 
 
 def apply_updates(
@@ -239,9 +320,14 @@ def apply_updates(
     temperature: str,
     zone: str,
     weights_by_abbr: Dict[str, str],
+    idx: Optional[Dict[str, Tuple[int, int]]] = None,
 ) -> List[List[str]]:
+    # One sheet scan answers every fixed-label lookup below
+    if idx is None:
+        idx = index_sheet_labels(rows)
+
     # 1) Cox UNI: two cells right of "Cox"
-    cox_pos = find_first_cell(rows, "Cox")
+    cox_pos = idx.get("Cox")
     if not cox_pos:
         raise ValueError('Could not find a cell named exactly "Cox".')
     cox_r, cox_c = cox_pos
@@ -249,7 +335,8 @@ def apply_updates(
     rows[cox_r][cox_c + 2] = cox_uni
 
     # 2) Crew weights (bounded correctly)
-    crew = find_crew_info_table(rows)
+    crew_from = _header_search_start(idx, _CREW_REQUIRED)
+    crew = find_crew_info_table(rows, crew_from) if crew_from is not None else None
     if not crew:
         raise ValueError("Could not locate Crew Info table (Position/Name/Abbr/Weight).")
     _crew_header_r, crew_start, crew_end, crew_cols = crew
@@ -259,96 +346,82 @@ def apply_updates(
     if abbr_c is None or weight_c is None:
         raise ValueError("Crew Info table missing Abbr or Weight column.")
 
-    # Write weights for seats 1–8 only
+    # Stripped, non-blank weights only, so the per-row lookup is a plain dict hit
+    resolved_weights: Dict[str, str] = {}
+    for k, v in weights_by_abbr.items():
+        if v is not None:
+            v = str(v).strip()
+            if v:
+                resolved_weights[k] = v
+
+    # Write weights for seats 1–8 only, and make sure none are left blank
     for r in range(crew_start, crew_end):
-        if not rows[r]:
+        row = rows[r]
+        if not row:
             continue
 
-        pos = (rows[r][0] or "").strip()
-        if not pos.isdigit():
-            continue
-        if int(pos) < 1 or int(pos) > 8:
+        pos = (row[0] or "").strip()
+        # Same seat rule as parse_first_crew: "01" is seat 1 too
+        if not pos.isdigit() or not 1 <= int(pos) <= 8:
             continue
 
-        pad_row(rows[r], weight_c + 1)
-        abbr = (rows[r][abbr_c] or "").strip().lower()
+        pad_row(row, weight_c + 1)
+        abbr = (row[abbr_c] or "").strip().lower()
 
         # Prefer abbr-based, fall back to seat-based (pos_1..pos_8)
-        w = weights_by_abbr.get(abbr)
-        if w is None or str(w).strip() == "":
-            w = weights_by_abbr.get(f"pos_{pos}")
-
-        if w is not None and str(w).strip() != "":
-            rows[r][weight_c] = str(w).strip()
+        w = resolved_weights.get(abbr) or resolved_weights.get("pos_" + pos)
+        if w:
+            row[weight_c] = w
 
-    # Ensure weights not blank for seats 1–8
-    for r in range(crew_start, crew_end):
-        if not rows[r]:
-            continue
-        pos = (rows[r][0] or "").strip()
-        if not pos.isdigit():
-            continue
-        if int(pos) < 1 or int(pos) > 8:
-            continue
-        pad_row(rows[r], weight_c + 1)
-        if (rows[r][weight_c] or "").strip() == "":
+        if (row[weight_c] or "").strip() == "":
             raise ValueError(f"Missing weight for seat {pos} in Crew Info. Fill seats 1–8.")
 
     # 3) Piece table (bounded to section, not #ERROR!)
-    piece_header_r = find_piece_header_row(rows)
-    if piece_header_r is None:
+    piece_from = _header_search_start(idx, _PIECE_REQUIRED)
+    piece = find_piece_header_row(rows, piece_from) if piece_from is not None else None
+    if piece is None:
         raise ValueError('Could not find Piece header row containing Pace/comment/Wind/Stream/Validated.')
 
-    table_start, table_end = find_table_bounds_from_header(rows, piece_header_r)
-
-    # Ensure Zone between comment and Wind
-    zone_c = _ensure_column_between(
-        rows=rows,
-        header_r=piece_header_r,
-        table_start=table_start,
-        table_end=table_end,
-        left_col_name="comment",
-        new_col_name="Zone",
-        right_col_name="Wind",
-    )
+    piece_header_r, table_end = piece
+    table_start = piece_header_r + 1
 
-    # Ensure Temperature after Validated
-    temp_c = _ensure_column_after(
+    # Ensure Zone between comment and Wind, and Temperature after Validated
+    cols = header_col_map(rows[piece_header_r])
+    _ensure_columns_batch(
         rows=rows,
         header_r=piece_header_r,
         table_end=table_end,
-        anchor_col_name="Validated",
-        new_col_name="Temperature",
+        cols=cols,
+        inserts=[("Zone", "comment", "Wind"), ("Temperature", "Validated", None)],
     )
 
-    # Rebuild col map after insertions
-    cols = header_col_map(rows[piece_header_r])
+    zone_c = cols["Zone"]
+    temp_c = cols["Temperature"]
     comment_c = cols["comment"]
     wind_c = cols["Wind"]
     stream_c = cols["Stream"]
     # validated_c = cols["Validated"]  # not needed for writing
 
+    pace_c = cols["Pace"]  # always present: part of _PIECE_REQUIRED
+
+    # Pad the table once up front instead of per row in the fill loop
+    _pad_rows_to(rows, table_start, table_end, max(pace_c, comment_c, zone_c, wind_c, stream_c, temp_c) + 1)
+
+    fills = ((comment_c, rig_info), (zone_c, zone), (wind_c, wind), (stream_c, stream), (temp_c, temperature))
+
     # Fill ONLY actual piece rows:
     # A "piece row" is one where Pace looks like a pace (contains ":")
     for r in range(table_start, table_end):
-        if not rows[r]:
-            continue
-        # skip totally empty lines
-        if not any((cell or "").strip() for cell in rows[r]):
-            continue
-
-        pad_row(rows[r], max(comment_c, zone_c, wind_c, stream_c, temp_c) + 1)
-
-        pace_val = (rows[r][cols["Pace"]] or "").strip() if "Pace" in cols else ""
+        # Blank rows have no pace either, so the pace check below skips them too
+        row = rows[r]
+        pace_raw = row[pace_c]
+        pace_val = pace_raw.strip() if pace_raw else ""
 
         # Only write metadata to real piece summary rows (pace-like)
-        if not pace_val or not PACE_LIKE.match(pace_val):
+        if not pace_val or not PACE_LIKE.search(pace_val):
             continue
 
-        rows[r][comment_c] = rig_info
-        rows[r][zone_c] = zone
-        rows[r][wind_c] = wind
-        rows[r][stream_c] = stream
-        rows[r][temp_c] = temperature
+        for c, value in fills:
+            row[c] = value
 
     return rows
\ No newline at end of file